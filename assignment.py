@@ -1,8 +1,18 @@
+import atexit
+import bisect
 import csv
 import json
 import os
 import shutil
-from datetime import datetime
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # ===================== File Names =====================
 STUDENTS_FILE = "students.csv"
@@ -10,45 +20,172 @@ COURSES_FILE = "courses.json"
 ENROLLMENTS_FILE = "enrollments.csv"
 LOG_FILE = "app.log"
 
+_UNSAFE_CODE_CHARS = frozenset(',"\r\n')
+# enrolled codes that need CSV quoting; add_course rejects them, but older
+# courses.json/enrollments.csv files may still contain some
+_unsafe_codes = set()    # set[str]
+
+def _check_code(code: str):
+    if _UNSAFE_CODE_CHARS.intersection(code):
+        _unsafe_codes.add(code)
+
 # ===================== Data Structures =====================
 students = {}            # dict[int, dict]
 courses = {}             # dict[str, dict]
-enrollments = []         # list[dict]
+enrollments = []         # list[Enrollment]
+
+class Enrollment:
+    __slots__ = ("sid", "code", "grade")
+
+    def __init__(self, sid: int, code: str, grade=None):
+        self.sid = sid
+        self.code = code
+        self.grade = grade
+
+# ===================== Indices =====================
+enrollment_index = {}    # dict[tuple[int, str], Enrollment]
+passed_courses = {}      # dict[int, set[str]], courses with a recorded grade
+enrollments_by_student = {}  # dict[int, list[Enrollment]]
+# kept out of the course dicts so it is not written to courses.json
+grade_totals = {}        # dict[str, list[float, int]] -> [sum, count]
+_EMPTY = frozenset()
+
+def _index_enrollment(e: Enrollment):
+    enrollment_index[(e.sid, e.code)] = e
+    enrollments_by_student.setdefault(e.sid, []).append(e)
+    if e.grade is not None:
+        _add_grade(e.code, e.grade, None)
+        passed_courses.setdefault(e.sid, set()).add(e.code)
+
+def _add_grade(code: str, grade: float, old_grade):
+    totals = grade_totals.setdefault(code, [0.0, 0])
+    if old_grade is None:
+        totals[0] += grade
+        totals[1] += 1
+    else:
+        totals[0] += grade - old_grade
+
+# students ordered best GPA first, as (-gpa, sid)
+_gpa_rank = []           # list[tuple[float, int]]
+
+# casefolded names/codes plus a trigram inverted index for substring search
+_name_cf = {}            # dict[int, str]
+_name_trigrams = {}      # dict[str, set[int]]
+_code_cf = {}            # dict[str, str]
+_code_trigrams = {}      # dict[str, set[str]]
+_course_by_cf = {}       # dict[str, str], casefolded code -> code
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _index_text(key, text: str, folded: dict, trigrams: dict):
+    text = text.casefold()
+    folded[key] = text
+    for t in _trigrams(text):
+        trigrams.setdefault(t, set()).add(key)
+
+def _index_student(sid: int):
+    _index_text(sid, students[sid]["name"], _name_cf, _name_trigrams)
+
+def _index_course(code: str):
+    _index_text(code, code, _code_cf, _code_trigrams)
+    _course_by_cf.setdefault(_code_cf[code], code)
+
+def _resolve_course(code: str):
+    # exact codes win; otherwise accept the code in any letter case
+    if code in courses:
+        return sys.intern(code)
+    return _course_by_cf.get(code.casefold(), code)
+
+def _find(q: str, folded: dict, trigrams: dict):
+    grams = _trigrams(q)
+    if grams:
+        postings = [trigrams.get(t) for t in grams]
+        if None in postings:
+            return []
+        candidates = min(postings, key=len).intersection(*postings)
+    else:
+        candidates = folded
+    return sorted(k for k in candidates if q in folded[k])
 
 # ===================== Logging =====================
+_log_file = None
+
+# timestamps are formatted once per minute; only the seconds change in between
+_stamp_minute = None
+_stamp_prefix = ""       # "YYYY-MM-DDTHH:MM" for log lines
+_stamp_compact = ""      # "YYYYMMDDHHMM" for backup file names
+
+def _tick():
+    global _stamp_minute, _stamp_prefix, _stamp_compact
+    now = int(time.time())
+    if now // 60 != _stamp_minute:
+        local = time.localtime(now)
+        _stamp_prefix = time.strftime("%Y-%m-%dT%H:%M", local)
+        _stamp_compact = time.strftime("%Y%m%d%H%M", local)
+        _stamp_minute = now // 60
+    return now % 60
+
+def open_log():
+    global _log_file
+    if _log_file is None:
+        _log_file = open(LOG_FILE, "a", buffering=8192)
+        atexit.register(_log_file.close)
+
+def flush_log():
+    if _log_file is not None:
+        _log_file.flush()
+
 def log_action(action: str):
-    with open(LOG_FILE, "a") as log:
-        log.write(f"{datetime.now()} - {action}\n")
+    if _log_file is None:
+        open_log()
+    seconds = _tick()
+    _log_file.write(f"{_stamp_prefix}:{seconds:02d} - {action}\n")
 
 # ===================== File I/O =====================
+class _SetEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, set):
+            return list(o)
+        return super().default(o)
+
 def load_students():
     global students
     if not os.path.exists(STUDENTS_FILE):
         return
     try:
         with open(STUDENTS_FILE, newline="") as f:
-            reader = csv.DictReader(f)
+            reader = csv.reader(f)
+            next(reader, None)
             for row in reader:
                 try:
-                    students[int(row["student_id"])] = {
-                        "name": row["full_name"],
-                        "year": int(row["year"]),
-                        "gpa": float(row["gpa"])
+                    sid, name, year, gpa = row
+                    sid = int(sid)
+                    students[sid] = {
+                        "name": name,
+                        "year": int(year),
+                        "gpa": float(gpa)
                     }
                 except Exception:
                     continue
+                _index_student(sid)
     except FileNotFoundError:
         pass
+    _gpa_rank[:] = sorted((-d["gpa"], sid) for sid, d in students.items())
 
 def load_courses():
     global courses
     if not os.path.exists(COURSES_FILE):
         return
     try:
-        with open(COURSES_FILE) as f:
-            courses = json.load(f)
-            for c in courses.values():
-                c.setdefault("enrolled", set())
+        with open(COURSES_FILE, "rb") as f:
+            data = f.read()
+        loaded = orjson.loads(data) if orjson else json.loads(data)
+        courses = {sys.intern(code): c for code, c in loaded.items()}
+        for code, c in courses.items():
+            c["enrolled"] = set(c.get("enrolled", ()))
+            c["prereqs"] = [sys.intern(p) for p in c.get("prereqs", ())]
+            _index_course(code)
     except Exception:
         pass
 
@@ -58,55 +195,71 @@ def load_enrollments():
         return
     try:
         with open(ENROLLMENTS_FILE, newline="") as f:
-            reader = csv.DictReader(f)
+            reader = csv.reader(f)
+            next(reader, None)
             for row in reader:
                 try:
-                    enrollments.append({
-                        "student_id": int(row["student_id"]),
-                        "course_code": row["course_code"],
-                        "grade": float(row["grade"]) if row["grade"] else None
-                    })
+                    sid, code, grade = row
+                    e = Enrollment(int(sid), sys.intern(code), float(grade) if grade else None)
                 except Exception:
                     continue
+                _check_code(e.code)
+                enrollments.append(e)
+                _index_enrollment(e)
     except FileNotFoundError:
         pass
 
+@contextmanager
+def _atomic_open(path: str, mode: str = "w", **kwargs):
+    # write beside the target and rename over it, so a crash never leaves a truncated file
+    tmp = path + ".tmp"
+    with open(tmp, mode, **kwargs) as f:
+        yield f
+    os.replace(tmp, path)
+
+def _backup(path: str, backup_file: str):
+    try:
+        if os.path.exists(backup_file):
+            os.remove(backup_file)
+        os.link(path, backup_file)
+    except OSError:
+        shutil.copy(path, backup_file)
+
 def save_students():
-    with open(STUDENTS_FILE, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["student_id", "full_name", "year", "gpa"])
-        writer.writeheader()
-        for sid, data in students.items():
-            writer.writerow({
-                "student_id": sid,
-                "full_name": data["name"],
-                "year": data["year"],
-                "gpa": data["gpa"]
-            })
-    backup_file = f"students_{datetime.now().strftime('%Y%m%d%H%M')}.csv"
-    shutil.copy(STUDENTS_FILE, backup_file)
+    with _atomic_open(STUDENTS_FILE, newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["student_id", "full_name", "year", "gpa"])
+        writer.writerows([sid, d["name"], d["year"], d["gpa"]] for sid, d in students.items())
+    _tick()
+    backup_file = f"students_{_stamp_compact}.csv"
+    _backup(STUDENTS_FILE, backup_file)
 
 def save_courses():
-    for c in courses.values():
-        if isinstance(c.get("enrolled"), set):
-            c["enrolled"] = list(c["enrolled"])
-    with open(COURSES_FILE, "w") as f:
-        json.dump(courses, f, indent=2)
-    for c in courses.values():
-        if isinstance(c.get("enrolled"), list):
-            c["enrolled"] = set(c["enrolled"])
+    if orjson:
+        with _atomic_open(COURSES_FILE, "wb") as f:
+            f.write(orjson.dumps(courses, option=orjson.OPT_INDENT_2, default=list))
+    else:
+        with _atomic_open(COURSES_FILE) as f:
+            json.dump(courses, f, cls=_SetEncoder, indent=2)
 
 def save_enrollments():
-    with open(ENROLLMENTS_FILE, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["student_id", "course_code", "grade"])
-        writer.writeheader()
-        for e in enrollments:
-            writer.writerow(e)
+    with _atomic_open(ENROLLMENTS_FILE, newline="") as f:
+        if _unsafe_codes:
+            writer = csv.writer(f)
+            writer.writerow(["student_id", "course_code", "grade"])
+            writer.writerows([e.sid, e.code, e.grade] for e in enrollments)
+            return
+        # every field is a number or a comma/quote-free course code,
+        # so rows are written without the csv module's per-field quoting checks
+        f.write("student_id,course_code,grade\r\n")
+        f.writelines(f"{e.sid},{e.code},{'' if e.grade is None else e.grade}\r\n" for e in enrollments)
 
 def save_all():
     save_students()
     save_courses()
     save_enrollments()
     log_action("Saved and backed up data")
+    flush_log()
 
 # ===================== Features =====================
 def list_students():
@@ -128,24 +281,30 @@ def add_student():
     year = int(input("Enter year: "))
     gpa = float(input("Enter GPA: "))
     students[sid] = {"name": name, "year": year, "gpa": gpa}
+    _index_student(sid)
+    bisect.insort(_gpa_rank, (-gpa, sid))
     log_action(f"Added student {sid}")
 
 def add_course():
-    code = input("Enter course code: ")
+    code = sys.intern(input("Enter course code: "))
     if code in courses:
         print("Course already exists.")
         return
+    if _UNSAFE_CODE_CHARS.intersection(code):
+        print("Course code cannot contain commas, quotes or line breaks.")
+        return
     title = input("Enter title: ")
     credits = int(input("Credits: "))
     cap = int(input("Capacity: "))
     prereqs = input("Prereqs (comma separated): ").split(",")
-    prereqs = [p.strip() for p in prereqs if p.strip()]
+    prereqs = [sys.intern(p.strip()) for p in prereqs if p.strip()]
     courses[code] = {"title": title, "credits": credits, "capacity": cap, "prereqs": prereqs, "enrolled": set()}
+    _index_course(code)
     log_action(f"Added course {code}")
 
 def enroll_student():
     sid = int(input("Student ID: "))
-    code = input("Course code: ")
+    code = _resolve_course(input("Course code: "))
     if sid not in students or code not in courses:
         print("Invalid student or course.")
         return
@@ -153,27 +312,33 @@ def enroll_student():
     if len(course["enrolled"]) >= course["capacity"]:
         print("Course full.")
         return
-    if (sid, code) in [(e["student_id"], e["course_code"]) for e in enrollments]:
+    if (sid, code) in enrollment_index:
         print("Already enrolled.")
         return
     # check prereqs
-    for pre in course["prereqs"]:
-        if all(e["course_code"] != pre for e in enrollments if e["student_id"] == sid):
-            print("Missing prerequisite.")
-            return
-    enrollments.append({"student_id": sid, "course_code": code, "grade": None})
+    missing = set(course["prereqs"]) - passed_courses.get(sid, _EMPTY)
+    if missing:
+        print(f"Missing prerequisite: {', '.join(sorted(missing))}")
+        return
+    e = Enrollment(sid, code)
+    _check_code(code)
+    enrollments.append(e)
+    _index_enrollment(e)
     course["enrolled"].add(sid)
     log_action(f"Enrolled {sid} in {code}")
 
 def record_grade():
     sid = int(input("Student ID: "))
-    code = input("Course code: ")
-    for e in enrollments:
-        if e["student_id"] == sid and e["course_code"] == code:
-            e["grade"] = float(input("Enter grade: "))
-            log_action(f"Updated grade for {sid} in {code}")
-            return
-    print("Enrollment not found.")
+    code = _resolve_course(input("Course code: "))
+    e = enrollment_index.get((sid, code))
+    if e is None:
+        print("Enrollment not found.")
+        return
+    grade = float(input("Enter grade: "))
+    _add_grade(code, grade, e.grade)
+    e.grade = grade
+    passed_courses.setdefault(sid, set()).add(code)
+    log_action(f"Updated grade for {sid} in {code}")
 
 def transcript():
     sid = int(input("Student ID: "))
@@ -181,30 +346,22 @@ def transcript():
         print("Student not found.")
         return
     print(f"Transcript for {students[sid]['name']}: ")
-    total_points = 0
-    total_credits = 0
-    for e in enrollments:
-        if e["student_id"] == sid:
-            code = e["course_code"]
-            grade = e["grade"]
-            print(f"{code} - {courses[code]['title']} : {grade}")
-            if grade is not None:
-                total_points += grade
-                total_credits += 1
-    if total_credits > 0:
-        gpa = total_points / total_credits
+    es = enrollments_by_student.get(sid, ())
+    for e in es:
+        print(f"{e.code} - {courses[e.code]['title']} : {e.grade}")
+    grades = [e.grade for e in es if e.grade is not None]
+    if grades:
+        gpa = sum(grades) / len(grades)
         print(f"Calculated GPA: {gpa:.2f}")
 
 def search():
-    q = input("Enter name or course code: ").lower()
+    q = input("Enter name or course code: ").casefold()
     print("Students:")
-    for sid, s in students.items():
-        if q in s["name"].lower():
-            print(f"{sid}: {s['name']}")
+    for sid in _find(q, _name_cf, _name_trigrams):
+        print(f"{sid}: {students[sid]['name']}")
     print("Courses:")
-    for code in courses:
-        if q in code.lower():
-            print(f"{code}: {courses[code]['title']}")
+    for code in _find(q, _code_cf, _code_trigrams):
+        print(f"{code}: {courses[code]['title']}")
 
 def analytics():
     print("1. Top N students by GPA")
@@ -213,8 +370,8 @@ def analytics():
     choice = input("Choose: ")
     if choice == "1":
         n = int(input("Enter N: "))
-        top = sorted(students.items(), key=lambda x: x[1]["gpa"], reverse=True)[:n]
-        for sid, data in top:
+        for _, sid in _gpa_rank[:n]:
+            data = students[sid]
             print(f"{data['name']} GPA {data['gpa']}")
     elif choice == "2":
         for code, c in courses.items():
@@ -223,17 +380,30 @@ def analytics():
             if fill > 90:
                 print("Warning: over 90% capacity!")
     elif choice == "3":
-        for code in courses:
-            grades = [e["grade"] for e in enrollments if e["course_code"] == code and e["grade"] is not None]
-            if grades:
-                avg = sum(grades) / len(grades)
-                print(f"{code}: avg grade {avg:.2f}")
+        for code, (total, count) in grade_totals.items():
+            avg = total / count
+            print(f"{code}: avg grade {avg:.2f}")
 
 # ===================== Main Loop =====================
+MENU = {
+    "1": lambda: (list_students(), list_courses()),
+    "2": add_student,
+    "3": add_course,
+    "4": enroll_student,
+    "5": record_grade,
+    "6": transcript,
+    "7": search,
+    "8": save_all,
+    "9": analytics,
+}
+
 def main():
-    load_students()
-    load_courses()
-    load_enrollments()
+    open_log()
+    # the loaders fill disjoint globals and indices, so they can run side by side
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        futures = [ex.submit(load_students), ex.submit(load_courses), ex.submit(load_enrollments)]
+        for f in futures:
+            f.result()
     while True:
         print("\nCampus Registrar Menu:")
         print("1. List students/courses")
@@ -247,29 +417,13 @@ def main():
         print("9. Analytics")
         print("10. Exit")
         choice = input("Enter choice: ")
-        match choice:
-            case "1":
-                list_students(); list_courses()
-            case "2":
-                add_student()
-            case "3":
-                add_course()
-            case "4":
-                enroll_student()
-            case "5":
-                record_grade()
-            case "6":
-                transcript()
-            case "7":
-                search()
-            case "8":
-                save_all()
-            case "9":
-                analytics()
-            case "10":
-                save_all(); break
-            case _:
-                print("Invalid choice.")
+        fn = MENU.get(choice)
+        if fn:
+            fn()
+        elif choice == "10":
+            save_all(); break
+        else:
+            print("Invalid choice.")
 
 if __name__== "__main__":
              main()
\ No newline at end of file